@@ -1,3 +1,4 @@
+import heapq
 import os
 import sys
 import re
@@ -12,21 +13,19 @@ from r_variable_counter import save_results as save_r_results
 def generate_combined_report(py_results, r_results, output_file="combined_vars.csv"):
     """Generate a combined report of Python and R variables"""
 
-    # Combine results and mark language
-    combined = []
-    for var, count in py_results:
-        combined.append((var, count, "python"))
-    for var, count in r_results:
-        combined.append((var, count, "r"))
+    # most_common() already yields each side sorted by descending count, so
+    # heapq.merge interleaves the two streams lazily — no merged list is
+    # materialized and no second sort runs
+    py_rows = ((var, count, "python") for var, count in py_results.most_common())
+    r_rows = ((var, count, "r") for var, count in r_results.most_common())
+    merged = heapq.merge(py_rows, r_rows, key=lambda row: -row[1])
 
-    # Sort by count (descending)
-    combined.sort(key=lambda x: x[1], reverse=True)
-
-    # Write to file
-    with open(output_file, "w") as f:
+    # Write to file in one batched call rather than one write per row
+    with open(output_file, "w", buffering=1 << 20) as f:
         f.write("var,count,language\n")
-        for var, count, lang in combined:
-            f.write(f"{var},{count},{lang}\n")
+        body = "\n".join(f"{var},{count},{lang}" for var, count, lang in merged)
+        if body:
+            f.write(body + "\n")
 
     return output_file
 
@@ -34,17 +33,11 @@ def generate_combined_report(py_results, r_results, output_file="combined_vars.c
 def find_shared_variables(py_results, r_results):
     """Find variables used in both Python and R code"""
 
-    py_vars = {var for var, _ in py_results}
-    r_vars = {var for var, _ in r_results}
-    shared = py_vars.intersection(r_vars)
-
-    # Get counts for shared variables
-    shared_with_counts = []
-    py_dict = dict(py_results)
-    r_dict = dict(r_results)
+    # keys() views intersect in C without materializing separate sets first
+    shared = py_results.keys() & r_results.keys()
 
-    for var in shared:
-        shared_with_counts.append((var, py_dict[var], r_dict[var]))
+    # Get counts for shared variables (the Counters are already mappings)
+    shared_with_counts = [(var, py_results[var], r_results[var]) for var in shared]
 
     # Sort by total count
     shared_with_counts.sort(key=lambda x: x[1] + x[2], reverse=True)
@@ -62,7 +55,7 @@ def print_combined_summary(py_results, py_files, r_results, r_files, shared_vars
 
     if shared_vars:
         print("\nTop shared variables (Python count, R count):")
-        print(f"{'\tVARIABLE':<30} {'PYTHON':<10} {'R':<10}")
+        print(f"\t{'VARIABLE':<29} {'PYTHON':<10} {'R':<10}")
         for var, py_count, r_count in shared_vars[:10]:
             print(f"\t{var:<30}{py_count:<10}{r_count:<10}")
 
@@ -99,9 +92,15 @@ if __name__ == "__main__":
     print_combined_summary(py_results, py_files, r_results, r_files, shared_vars)
 
     # Intentional code duplication - save shared variables to file
-    with open("shared_variables.csv", "w") as f:
+    with open("shared_variables.csv", "w", buffering=1 << 20) as f:
         f.write("var,python_count,r_count,total\n")
-        for var, py_count, r_count in shared_vars:
-            f.write(f"{var},{py_count},{r_count},{py_count+r_count}\n")
+        if shared_vars:
+            f.write(
+                "\n".join(
+                    f"{var},{py_count},{r_count},{py_count+r_count}"
+                    for var, py_count, r_count in shared_vars
+                )
+            )
+            f.write("\n")
 
     print(f"Shared variables saved to shared_variables.csv")
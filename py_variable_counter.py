@@ -1,109 +1,118 @@
+import hashlib
+import mmap
 import os
 import re
-
-
-def get_python_patterns():
-    """Define and return regex patterns for Python variable detection"""
-
-    # Basic building blocks as named constants
-    # Named capture version for direct use
-    IDENTIFIER_NAMED = r"""
-        (?P<varname>         # Named capture group for the variable
-            [a-zA-Z_]        # Start with letter or underscore
-            [a-zA-Z0-9_]*    # Followed by letters, numbers, or underscores
-        )
-    """
-
-    # Non-capturing version for use in repeated contexts
-    IDENTIFIER_RAW = r"""
-        [a-zA-Z_]            # Start with letter or underscore
-        [a-zA-Z0-9_]*        # Followed by letters, numbers, or underscores
-    """
-
-    WHITESPACE = r"\s*"  # Optional whitespace
-
-    # Standard equals assignment: var = value
-    EQUALS_ASSIGN = rf"""
-        {IDENTIFIER_NAMED}   # Variable name
-        {WHITESPACE}         # Optional whitespace
-        =                    # Equals sign
-        (?!=)                # Negative lookahead to avoid matching == comparison
-    """
-
-    # Walrus operator assignment: var := value (Python 3.8+)
-    WALRUS_ASSIGN = rf"""
-        {IDENTIFIER_NAMED}   # Variable name
-        {WHITESPACE}         # Optional whitespace
-        :=                   # Walrus operator
-    """
-
-    # Multiple assignment pattern: var1, var2 = value1, value2
-    # Using the non-captured version to avoid name conflicts
-    MULTI_ASSIGN = rf"""
-        (                    # Group for the list of variables
-            {IDENTIFIER_RAW} # First variable (non-capturing)
-            (?:              # Non-capturing group for additional variables
-                {WHITESPACE},  # Comma separator
-                {WHITESPACE}   # Optional whitespace
-                {IDENTIFIER_RAW}  # Additional variable (non-capturing)
-            )+               # One or more additional variables
-        )
-        {WHITESPACE}         # Optional whitespace
-        =                    # Equals sign
-    """
-
-    # Augmented assignments (+=, -=, *=, /=, etc.)
-    AUGMENTED_ASSIGN = rf"""
-        {IDENTIFIER_NAMED}   # Variable name
-        {WHITESPACE}         # Optional whitespace
-        (?P<operator>        # Named capture for the operator
-            [+\-*/%@&|^]=    # Single-character augmented assignments
-            |                # OR
-            //=              # Floor division
-            |                # OR
-            >>=              # Right shift
-            |                # OR
-            <<=              # Left shift
-            |                # OR
-            \*\*=            # Exponentiation
-        )
-    """
-
-    # For loop variable pattern
-    FOR_LOOP = rf"""
-        for                  # For keyword
-        {WHITESPACE}         # Whitespace
-        {IDENTIFIER_NAMED}   # Loop variable
-        {WHITESPACE}         # Whitespace
-        in                   # in keyword
-    """
-
-    # Simple pattern to extract variable names from multi-assigns
-    VAR_EXTRACTOR = r"""
-        (?P<varname>         # Named capture for variable name
-            [a-zA-Z_]        # Start with letter or underscore
-            [a-zA-Z0-9_]*    # Followed by letters, numbers, or underscores
-        )
-    """
-
-    patterns = {
-        "equals": re.compile(EQUALS_ASSIGN, re.VERBOSE),
-        "walrus": re.compile(WALRUS_ASSIGN, re.VERBOSE),
-        "multi_assign": re.compile(MULTI_ASSIGN, re.VERBOSE),
-        "augmented": re.compile(AUGMENTED_ASSIGN, re.VERBOSE),
-        "for_loop": re.compile(FOR_LOOP, re.VERBOSE),
-        "var_name": re.compile(
-            VAR_EXTRACTOR, re.VERBOSE
-        ),  # Used for extracting from multi-assigns
+import shelve
+import sys
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Hyperscan is an optional accelerator; the plain re path below is the fallback
+try:
+    import hyperscan
+except ImportError:
+    hyperscan = None
+
+# pyahocorasick is an optional prefilter for the plain re path
+try:
+    import ahocorasick
+except ImportError:
+    ahocorasick = None
+
+# NumPy accelerates the output sort; Numba JIT-compiles the hand-written
+# assignment scanner below and needs numpy for its buffer views
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+try:
+    from numba import njit
+except ImportError:
+    njit = None
+if np is None:
+    njit = None
+
+
+# Keywords that can be followed by = in comparisons and must not be counted
+# as variables. The assign_any pattern rejects them in C via a lookahead; this
+# set is only consulted by the JIT scanner path, which extracts names itself.
+PY_KEYWORDS = frozenset(
+    {
+        b"if",
+        b"while",
+        b"for",
+        b"elif",
+        b"return",
+        b"and",
+        b"or",
+        b"not",
+        b"is",
+        b"in",
+        b"None",
+        b"True",
+        b"False",
     }
-
-    return patterns
-
-
-def should_skip_directory(dirname):
-    """Check if a directory should be skipped during analysis"""
-    # List of directories to skip
-    skip_dirs = {
+)
+
+# Regex patterns for Python variable detection, compiled once at import time.
+# Compact literals keep re's parser/translator work minimal, and positional
+# group(1) is cheaper to extract than a named group. The patterns are bytes
+# patterns: scanning raw bytes skips the whole-file UTF-8 decode, and matched
+# names are decoded individually instead.
+PY_PATTERNS = {
+    # Any single-name assignment: equals, walrus, and augmented forms all share
+    # the shape IDENT WS OP, so one alternation scans the file once instead of
+    # three times. The leading lookahead rejects keywords inside the regex
+    # engine, and \b stops the engine from rematching a keyword's suffix; the
+    # trailing lookahead still rejects == comparison.
+    "assign_any": re.compile(
+        rb"\b(?!(?:if|while|for|elif|return|and|or|not|is|in|None|True|False)\b)"
+        rb"([a-zA-Z_]\w*)\s*(?:(?:\+|-|\*\*?|//?|%|@|&|\||\^|>>|<<)?=(?!=)|:=)"
+    ),
+    # Multiple assignment: var1, var2 = value1, value2
+    "multi_assign": re.compile(rb"([a-zA-Z_]\w*(?:\s*,\s*[a-zA-Z_]\w*)+)\s*="),
+    # For loop variable: for var in ...
+    "for_loop": re.compile(rb"for\s*([a-zA-Z_]\w*)\s*in"),
+    # Used for extracting individual names from multi-assigns
+    "var_name": re.compile(rb"([a-zA-Z_]\w*)"),
+}
+
+
+# Hyperscan expressions mirror the patterns above, minus constructs the
+# Hyperscan compiler rejects (lookaheads, named groups). Each hit is confirmed
+# with the corresponding re pattern at the reported start offset, so the
+# semantics stay identical to the pure-re path.
+HS_EXPRESSIONS = [
+    (0, rb"[a-zA-Z_]\w*\s*(?:(?:\+|-|\*\*?|//?|%|@|&|\||\^|>>|<<)?=|:=)"),  # assign_any
+    (1, rb"[a-zA-Z_]\w*(?:\s*,\s*[a-zA-Z_]\w*)+\s*="),  # multi_assign
+    (2, rb"for\s*[a-zA-Z_]\w*\s*in"),  # for_loop
+]
+
+
+def build_hyperscan_database():
+    """Compile all patterns into one Hyperscan database for a single-pass scan"""
+    if hyperscan is None:
+        return None
+    db = hyperscan.Database()
+    db.compile(
+        expressions=[expr for _, expr in HS_EXPRESSIONS],
+        ids=[pattern_id for pattern_id, _ in HS_EXPRESSIONS],
+        # SOM_LEFTMOST reports match start offsets, which we need to re-anchor
+        # the confirming re pattern
+        flags=[hyperscan.HS_FLAG_SOM_LEFTMOST] * len(HS_EXPRESSIONS),
+    )
+    return db
+
+
+# Built once per process at import time; worker processes each compile their
+# own copy since Hyperscan databases cannot be pickled across the pool
+HS_DB = build_hyperscan_database()
+
+
+# Directories to skip during analysis, built once at import time
+SKIP_DIRS = frozenset(
+    {
         ".git",  # Git repository
         "venv",  # Virtual environment
         ".venv",  # Alternative virtual environment name
@@ -119,110 +128,580 @@ def should_skip_directory(dirname):
         ".vscode",  # VS Code files
         ".ipynb_checkpoints",  # Jupyter notebook checkpoints
     }
-    return dirname in skip_dirs
+)
+
+
+# Literal anchors that must appear inside any true match, mapped to the
+# patterns that can fire around them. An Aho-Corasick pass over these cheap
+# literals prunes the regions the regex engine has to visit.
+ANCHOR_PATTERNS = {
+    b"=": ("assign_any", "multi_assign"),
+    b":=": ("assign_any",),
+    b"for": ("for_loop",),
+}
+
+# Above one hit per this many bytes, confirming every hit would cost more
+# than one full scan, so the prefilter falls back to it
+PREFILTER_DENSITY = 32
+
+# Byte classes used to re-anchor anchor hits onto true identifier run starts;
+# OP_PREFIX_BYTES are the bytes an operator can put between a name and the =
+WORD_BYTES = frozenset(
+    b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_"
+)
+IDENT_START_BYTES = frozenset(b"abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ_")
+SPACE_BYTES = frozenset(b" \t\n\r\x0b\x0c")
+OP_PREFIX_BYTES = frozenset(b"+-*/%@&|^><:")
+
+
+def build_anchor_automaton():
+    """Build the Aho-Corasick automaton over the literal anchors.
+
+    The standard pyahocorasick wheel is a unicode build, so the anchors go
+    in as latin-1 text and scan_with_prefilter feeds it a latin-1 decode of
+    the byte buffer; latin-1 maps every byte to one code point, so the hit
+    offsets index straight back into the bytes. The stored values stay
+    bytes so the hit values key straight into ANCHOR_PATTERNS.
+    """
+    if ahocorasick is None:
+        return None
+    automaton = ahocorasick.Automaton()
+    try:
+        for anchor in ANCHOR_PATTERNS:
+            automaton.add_word(anchor.decode("latin-1"), anchor)
+        automaton.make_automaton()
+    except TypeError:
+        # A custom bytes build of pyahocorasick rejects str keys
+        return None
+    return automaton
 
 
-def analyze_python_file(file_path, patterns):
-    """Analyze a single Python file and return variable counts"""
+AC_AUTOMATON = build_anchor_automaton()
 
-    local_counts = {}
 
-    try:
-        with open(file_path, "r", encoding="utf-8", errors="ignore") as f:
-            content = f.read()
-
-            # Process standard assignments (var = value)
-            for match in patterns["equals"].finditer(content):
-                var = match.group("varname")
-                # Skip keywords that might be followed by comparison
-                if var not in (
-                    "if",
-                    "while",
-                    "for",
-                    "elif",
-                    "return",
-                    "and",
-                    "or",
-                    "not",
-                    "is",
-                    "in",
-                    "None",
-                    "True",
-                    "False",
+# On-disk cache of per-file results, shared by both counters. Entries are
+# keyed by path + mtime + size plus PATTERNS_VERSION (defined below the
+# strip pattern it covers), so any change that affects counts invalidates
+# every cached result automatically. Bump SCANNER_VERSION by hand when
+# scanner logic changes counts without touching a pattern source.
+CACHE_FILE = ".varcount_cache"
+SCANNER_VERSION = b"1"
+
+
+def should_skip_directory(dirname):
+    """Check if a directory should be skipped during analysis"""
+    return dirname in SKIP_DIRS
+
+
+def walk_source_files(directory):
+    """Yield Python source file paths under directory using os.scandir.
+
+    DirEntry caches is_dir/is_file results from the directory read itself,
+    so this walk issues far fewer stat calls than os.walk and never builds
+    intermediate name lists.
+    """
+    stack = [directory]
+    while stack:
+        current = stack.pop()
+        try:
+            entries = os.scandir(current)
+        except OSError as e:
+            print(f"Error with {current}: {e}")
+            continue
+        with entries:
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name not in SKIP_DIRS:
+                        stack.append(entry.path)
+                elif entry.is_file(follow_symlinks=False) and entry.name.endswith(
+                    ".py"
                 ):
-                    local_counts[var] = local_counts.get(var, 0) + 1
+                    yield entry.path
+
+
+def scan_with_regex(content, patterns, local_counts):
+    """Count variables by running each compiled re pattern over the content"""
+
+    # Process single-name assignments (var = value, var := value, var += 1);
+    # the pattern itself filters out keywords followed by comparison
+    local_counts.update(
+        match.group(1) for match in patterns["assign_any"].finditer(content)
+    )
+
+    # Process multiple assignments (x, y = 1, 2)
+    for match in patterns["multi_assign"].finditer(content):
+        local_counts.update(
+            var_match.group(1)
+            for var_match in patterns["var_name"].finditer(match.group(1))
+        )
+
+    # Process for loop variables
+    local_counts.update(
+        match.group(1) for match in patterns["for_loop"].finditer(content)
+    )
+
+
+if njit is not None:
+    # Character-class lookup tables indexed by byte value, so the scanner can
+    # classify each byte with one branchless array load
+    IDENT_START = np.zeros(256, np.uint8)
+    IDENT_CONT = np.zeros(256, np.uint8)
+    IS_SPACE = np.zeros(256, np.uint8)
+    for _byte in range(256):
+        _char = chr(_byte)
+        if _char.isalpha() and _byte < 128 or _char == "_":
+            IDENT_START[_byte] = 1
+            IDENT_CONT[_byte] = 1
+        elif _char.isdigit() and _byte < 128:
+            # The < 128 guard matches bytes \w: chr() classifies 178/179/185
+            # (Latin-1 superscripts) as digits, but the patterns do not
+            IDENT_CONT[_byte] = 1
+    for _byte in b" \t\n\r\x0b\x0c":
+        IS_SPACE[_byte] = 1
+
+    @njit(cache=True)
+    def scan_py_assignments(buf, ident_start, ident_cont, is_space, starts, lengths):
+        """Scan a byte buffer for IDENT WS OP assignment sites at near-C speed.
+
+        Mirrors the assign_any pattern exactly, including finditer's
+        non-overlapping left-to-right behavior and the word-boundary rule:
+        identifiers never start mid-word, so a failed operator check skips
+        the whole run. Keyword filtering happens in the caller. Returns the
+        number of spans written into the preallocated starts/lengths arrays.
+        """
+        n = buf.size
+        count = 0
+        i = 0
+        while i < n:
+            if ident_start[buf[i]] == 0:
+                i += 1
+                continue
+            # Mirror the pattern's \b: never start an identifier mid-word
+            # (e.g. right after a digit)
+            if i > 0 and ident_cont[buf[i - 1]] != 0:
+                i += 1
+                continue
+            run_start = i
+            i += 1
+            while i < n and ident_cont[buf[i]] != 0:
+                i += 1
+            run_end = i
+
+            j = run_end
+            while j < n and is_space[buf[j]] != 0:
+                j += 1
+
+            end = -1
+            if j < n:
+                c = buf[j]
+                if c == 61:  # = (reject ==)
+                    if j + 1 >= n or buf[j + 1] != 61:
+                        end = j + 1
+                elif c == 58:  # :=
+                    if j + 1 < n and buf[j + 1] == 61:
+                        end = j + 2
+                elif (
+                    c == 43
+                    or c == 45
+                    or c == 37
+                    or c == 64
+                    or c == 38
+                    or c == 124
+                    or c == 94
+                ):
+                    # + - % @ & | ^ followed by = (reject ===-style)
+                    if j + 1 < n and buf[j + 1] == 61:
+                        if j + 2 >= n or buf[j + 2] != 61:
+                            end = j + 2
+                elif c == 42 or c == 47:  # * ** / // followed by =
+                    k = j + 1
+                    if k < n and buf[k] == c:
+                        k += 1
+                    if k < n and buf[k] == 61:
+                        if k + 1 >= n or buf[k + 1] != 61:
+                            end = k + 1
+                elif c == 62 or c == 60:  # >> << followed by =
+                    if j + 2 < n and buf[j + 1] == c and buf[j + 2] == 61:
+                        if j + 3 >= n or buf[j + 3] != 61:
+                            end = j + 3
+
+            if end >= 0:
+                starts[count] = run_start
+                lengths[count] = run_end - run_start
+                count += 1
+                i = end
+            else:
+                i = run_end
+        return count
+
+
+def scan_with_numba(content, patterns, local_counts):
+    """Count variables using the JIT scanner for the hot assignment path.
+
+    The assignment path dominates runtime for typical .py files; multiple
+    assignments and for-loop variables are rarer, so those stay on re.
+    """
+
+    buf = np.frombuffer(content, dtype=np.uint8)
+    # Every match consumes at least an identifier byte and an operator byte
+    starts = np.empty(buf.size // 2 + 1, np.int64)
+    lengths = np.empty(buf.size // 2 + 1, np.int64)
+    count = scan_py_assignments(buf, IDENT_START, IDENT_CONT, IS_SPACE, starts, lengths)
+
+    local_counts.update(
+        name
+        for name in (content[starts[k] : starts[k] + lengths[k]] for k in range(count))
+        if name not in PY_KEYWORDS
+    )
+
+    # Process multiple assignments (x, y = 1, 2)
+    for match in patterns["multi_assign"].finditer(content):
+        local_counts.update(
+            var_match.group(1)
+            for var_match in patterns["var_name"].finditer(match.group(1))
+        )
 
-            # Process walrus operator assignments (var := value)
-            for match in patterns["walrus"].finditer(content):
-                var = match.group("varname")
-                local_counts[var] = local_counts.get(var, 0) + 1
+    # Process for loop variables
+    local_counts.update(
+        match.group(1) for match in patterns["for_loop"].finditer(content)
+    )
 
-            # Process multiple assignments (x, y = 1, 2)
-            for match in patterns["multi_assign"].finditer(content):
-                var_list = match.group(1)
-                for var_match in patterns["var_name"].finditer(var_list):
-                    var_name = var_match.group("varname")
-                    local_counts[var_name] = local_counts.get(var_name, 0) + 1
 
-            # Process augmented assignments (x += 1, etc.)
-            for match in patterns["augmented"].finditer(content):
-                var = match.group("varname")
-                local_counts[var] = local_counts.get(var, 0) + 1
+def find_assign_start(content, anchor_start):
+    """Walk back from an assignment operator to the start of its name.
 
-            # Process for loop variables
-            for match in patterns["for_loop"].finditer(content):
-                var = match.group("varname")
-                local_counts[var] = local_counts.get(var, 0) + 1
+    An assignment match is NAME WS OP with the anchor at the end of OP, so
+    the only place it can open is at the head of the word run directly
+    before; walking the content back over the operator prefix, the
+    whitespace and the run is unbounded, unlike a fixed window (64+ bytes
+    of alignment padding before = is valid Python). The confirming match
+    rejects the candidate when the bytes walked over form no real operator.
+    """
+    pos = anchor_start
+    while pos > 0 and content[pos - 1] in OP_PREFIX_BYTES:
+        pos -= 1
+    while pos > 0 and content[pos - 1] in SPACE_BYTES:
+        pos -= 1
+    while pos > 0 and content[pos - 1] in WORD_BYTES:
+        pos -= 1
+    return pos
+
+
+def find_list_starts(content, anchor_start):
+    """Walk back from a multi-assignment's = to its possible list starts.
+
+    The comma-separated list can extend past any fixed window, so the
+    candidates come from the content itself: word runs and the \\s*,\\s*
+    separators between them are absorbed leftward one at a time. The
+    pattern can only open at a letter or underscore, so each run
+    contributes its first such byte. Starts are returned leftmost-first:
+    the leftmost one that confirms is the match finditer would report,
+    but a digit-led run can force the match to open at a shorter
+    sub-list (e.g. "a, 1b, c =" only matches from "b"), so the later
+    starts must stay available as fallbacks.
+    """
+    pos = anchor_start
+    while pos > 0 and content[pos - 1] in SPACE_BYTES:
+        pos -= 1
+    starts = []
+    while True:
+        run_end = pos
+        while pos > 0 and content[pos - 1] in WORD_BYTES:
+            pos -= 1
+        if pos == run_end:
+            break
+        for k in range(pos, run_end):
+            if content[k] in IDENT_START_BYTES:
+                starts.append(k)
+                break
+        # Absorb one "\s*,\s*" separator plus whatever run precedes it
+        probe = pos
+        while probe > 0 and content[probe - 1] in SPACE_BYTES:
+            probe -= 1
+        if probe == 0 or content[probe - 1] != 0x2C:  # ,
+            break
+        probe -= 1
+        while probe > 0 and content[probe - 1] in SPACE_BYTES:
+            probe -= 1
+        pos = probe
+    starts.reverse()
+    return starts
+
+
+def scan_with_prefilter(content, patterns, local_counts):
+    """Regex-confirm candidate sites located via cheap literal anchor hits.
+
+    Most lines in a source file are not assignments, so the full patterns
+    waste time on bytes that cannot match. Each anchor hit is walked back
+    to the candidate starts that could precede it and the confirming
+    pattern runs there against the full content, so only matches the
+    full-scan patterns would produce are ever emitted.
+    """
+
+    # latin-1 decodes byte-for-byte, so hit offsets map 1:1 onto content
+    hits = list(AC_AUTOMATON.iter(content.decode("latin-1")))
+    if len(hits) * PREFILTER_DENSITY > len(content):
+        # Anchor-dense file: confirming each hit would cost more than one scan
+        scan_with_regex(content, patterns, local_counts)
+        return
+
+    seen = set()
+    # Every for-loop match starts at a "for" anchor and finditer keeps such
+    # matches non-overlapping, so matching at each anchor past the previous
+    # match end reproduces the full scan exactly
+    for_last_end = 0
+    for anchor_end, anchor in hits:
+        anchor_start = anchor_end + 1 - len(anchor)
+
+        for key in ANCHOR_PATTERNS[anchor]:
+            if key == "for_loop":
+                if anchor_start < for_last_end:
+                    continue
+                match = patterns[key].match(content, anchor_start)
+                if match is not None:
+                    for_last_end = match.end()
+                    local_counts[match.group(1)] += 1
+                continue
+
+            if key == "multi_assign":
+                candidates = find_list_starts(content, anchor_start)
+            else:
+                candidates = [find_assign_start(content, anchor_start)]
+
+            for start in candidates:
+                if (key, start) in seen:
+                    # Already counted from an overlapping anchor (the = and
+                    # := hits of one walrus derive the same start)
+                    break
+                # Confirm against the full content; the match must reach past
+                # this anchor
+                match = patterns[key].match(content, start)
+                if match is None or match.end() <= anchor_end:
+                    continue
+                seen.add((key, start))
+
+                if key == "multi_assign":
+                    local_counts.update(
+                        var_match.group(1)
+                        for var_match in patterns["var_name"].finditer(match.group(1))
+                    )
+                else:
+                    local_counts[match.group(1)] += 1
+                # Candidates run leftmost-first, so the first confirmed one
+                # is the match finditer would report; the rest are sub-lists
+                break
+
+
+def scan_with_hyperscan(content, patterns, hs_db, local_counts):
+    """Count variables with one Hyperscan pass, confirming hits via re"""
+
+    hits = []
+
+    def on_match(pattern_id, start, end, flags, context):
+        context.append((pattern_id, start))
+
+    hs_db.scan(content, match_event_handler=on_match, context=hits)
+
+    # Map pattern IDs back to the confirming re patterns
+    confirm = {
+        0: patterns["assign_any"],
+        1: patterns["multi_assign"],
+        2: patterns["for_loop"],
+    }
 
-            return local_counts, True
+    seen = set()
+    for pattern_id, start in hits:
+        if (pattern_id, start) in seen:
+            continue
+        seen.add((pattern_id, start))
+
+        match = confirm[pattern_id].match(content, start)
+        if match is None:
+            continue
+
+        if pattern_id == 1:
+            # Multi-assignment: pull each name out of the variable list
+            local_counts.update(
+                var_match.group(1)
+                for var_match in patterns["var_name"].finditer(match.group(1))
+            )
+            continue
+
+        local_counts[match.group(1)] += 1
+
+
+# Strings and comments can contain assignment-like text that produces false
+# "variables" and wastes scan time; one sub pass blanks them before scanning
+PY_STRIP = re.compile(
+    rb"#[^\n]*"
+    rb'|"""[\s\S]*?"""'
+    rb"|'''[\s\S]*?'''"
+    rb'|"(?:\\.|[^"\\])*"'
+    rb"|'(?:\\.|[^'\\])*'"
+)
+
+# The hash covers every pattern source that influences counts — the strip
+# pass changes what the scanners see, so it must invalidate the cache too
+PATTERNS_VERSION = hashlib.sha1(
+    b"\n".join(
+        [SCANNER_VERSION]
+        + [pattern.pattern for pattern in PY_PATTERNS.values()]
+        + [PY_STRIP.pattern]
+    )
+).hexdigest()
+
+# Files larger than this are mmap'd instead of copied into a bytes object
+MMAP_THRESHOLD = 1 << 20
+
+
+def scan_buffer(content, patterns, hs_db, local_counts):
+    """Dispatch a bytes-like buffer to the fastest available scanner"""
+
+    # The Hyperscan binding and pyahocorasick want real bytes objects;
+    # mmap'd buffers go through re, which accepts any buffer-protocol object
+    if hs_db is not None and isinstance(content, bytes):
+        scan_with_hyperscan(content, patterns, hs_db, local_counts)
+    elif njit is not None:
+        scan_with_numba(content, patterns, local_counts)
+    elif AC_AUTOMATON is not None and isinstance(content, bytes):
+        scan_with_prefilter(content, patterns, local_counts)
+    else:
+        scan_with_regex(content, patterns, local_counts)
+
+
+def analyze_python_file(file_path):
+    """Analyze a single Python file and return variable counts"""
+
+    local_counts = Counter()
+
+    try:
+        with open(file_path, "rb") as f:
+            if os.fstat(f.fileno()).st_size > MMAP_THRESHOLD:
+                # Map large files so the scan reads pages straight from the
+                # page cache instead of copying the whole file up front
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                    scrubbed = PY_STRIP.sub(b" ", content)
+            else:
+                scrubbed = PY_STRIP.sub(b" ", f.read())
+
+        scan_buffer(scrubbed, PY_PATTERNS, HS_DB, local_counts)
+
+        # Matching ran on raw bytes; decode each unique name once per file.
+        # Interning makes later dict lookups and merges hit the
+        # pointer-equality fast path, since names repeat heavily across files
+        decoded = Counter()
+        for name, count in local_counts.items():
+            decoded[sys.intern(name.decode("utf-8", "ignore"))] = count
+
+        return decoded, True
 
     except Exception as e:
         print(f"Error with {file_path}: {e}")
-        return {}, False
+        return Counter(), False
 
 
-def count_variables(directory):
-    """Count variables in Python files within a directory"""
+def analyze_one_file(path):
+    """Analyze one file in a worker process using the module-level patterns"""
+    file_counts, success = analyze_python_file(path)
+    return path, file_counts, success
 
-    counts = {}
-    processed_files = []
-    patterns = get_python_patterns()
 
-    # Using topdown=True allows us to modify dirs in-place to skip directories
-    for root, dirs, files in os.walk(directory, topdown=True):
-        # Modify dirs in-place to skip unwanted directories
-        dirs[:] = [d for d in dirs if not should_skip_directory(d)]
+def intern_counts(file_counts):
+    """Re-intern Counter keys; pickling over the pool or cache drops interning"""
+    return {sys.intern(var): count for var, count in file_counts.items()}
 
-        for file in files:
-            if file.endswith(".py"):
-                path = os.path.join(root, file)
-                file_counts, success = analyze_python_file(path, patterns)
 
-                # Update global counts
-                for var, count in file_counts.items():
-                    counts[var] = counts.get(var, 0) + count
+def count_variables(directory):
+    """Count variables in Python files within a directory"""
 
-                if success:
-                    processed_files.append(path)
+    counts = Counter()
+    processed_files = []
+    paths = list(walk_source_files(directory))
 
-    # Sort variables by frequency (most frequent first)
-    sorted_vars = sorted(counts.items(), key=lambda x: x[1], reverse=True)
-    return sorted_vars, processed_files
+    try:
+        cache = shelve.open(CACHE_FILE)
+    except Exception:
+        # A corrupt or locked cache should never break a run
+        cache = None
+
+    # Serve unchanged files straight from the cache; only changed or new
+    # files go to the scanners
+    cache_keys = {}
+    to_scan = []
+    if cache is not None:
+        for path in paths:
+            try:
+                file_stat = os.stat(path)
+            except OSError:
+                to_scan.append(path)
+                continue
+            key = (
+                f"{PATTERNS_VERSION}:{path}:{file_stat.st_mtime_ns}:{file_stat.st_size}"
+            )
+            cache_keys[path] = key
+            if key in cache:
+                counts.update(intern_counts(cache[key]))
+                processed_files.append(path)
+            else:
+                to_scan.append(path)
+    else:
+        to_scan = paths
+
+    # Regex scanning is CPU-bound and independent per file, so fan the work
+    # out across cores; chunking amortizes the pickling overhead per task
+    with ProcessPoolExecutor() as executor:
+        for path, file_counts, success in executor.map(
+            analyze_one_file, to_scan, chunksize=32
+        ):
+            # Update global counts
+            counts.update(intern_counts(file_counts))
+
+            if success:
+                processed_files.append(path)
+                if cache is not None and path in cache_keys:
+                    cache[cache_keys[path]] = file_counts
+
+    if cache is not None:
+        cache.close()
+
+    # Return the raw Counter; consumers that need frequency order use
+    # most_common(), which only pays for the ordering they actually ask for
+    return counts, processed_files
 
 
 def save_results(results, processed_files, prefix="python"):
     """Save variable counts and processed files to output files"""
 
+    # Join each report into one string and emit it with a single write call
+    # instead of paying a Python-to-IO-layer crossing per row
     filename_vars = f"{prefix}_var_counts.csv"
-    with open(filename_vars, "w") as f:
+    with open(filename_vars, "w", buffering=1 << 20) as f:
         f.write("var,count\n")
-        for var, count in results:
-            f.write(f"{var},{count}\n")
+        if results:
+            if np is not None:
+                # SoA layout: parallel name/count arrays order via np.argsort
+                # in C instead of comparing (str, int) tuples in Python
+                names = np.array(list(results.keys()))
+                freqs = np.fromiter(
+                    results.values(), dtype=np.int64, count=len(results)
+                )
+                order = np.argsort(-freqs, kind="stable")
+                rows = "\n".join(
+                    f"{var},{count}" for var, count in zip(names[order], freqs[order])
+                )
+            else:
+                # Sorted by frequency (most frequent first) via Counter's heap
+                rows = "\n".join(
+                    f"{var},{count}" for var, count in results.most_common()
+                )
+            f.write(rows)
+            f.write("\n")
 
     filename_files = f"processed_{prefix}_files.txt"
-    with open(filename_files, "w") as f:
-        for file_path in processed_files:
-            f.write(f"{file_path}\n")
+    with open(filename_files, "w", buffering=1 << 20) as f:
+        if processed_files:
+            f.write("\n".join(processed_files))
+            f.write("\n")
 
     return filename_vars, filename_files
 
@@ -233,18 +712,16 @@ def print_summary(results, processed_files, prefix="Python"):
     print(f"Found {len(results)} {prefix} variables")
     print(f"Processed {len(processed_files)} {prefix} scripts")
 
-    # top variables
-    num_top_vars = min(10, len(results))  # Show top 10 or all if less than 10
+    # top variables: most_common(10) is an O(N log 10) heap selection, no
+    # full sort needed just for display
     if results:
         print(f"\n{prefix} variables (descending freq):")
-        print(f"{'\tVARIABLE':<30} {'N':<10}")
-        for var, count in results[:num_top_vars]:
+        print(f"\t{'VARIABLE':<29} {'N':<10}")
+        for var, count in results.most_common(10):
             print(f"\t{var:<30}{count:<10}")
 
 
 if __name__ == "__main__":
-    import sys
-
     if len(sys.argv) != 2:
         print("Usage: python python_variable_analyzer.py <directory>")
         sys.exit(1)